@@ -1,21 +1,16 @@
 """
 Context Rot Monitor - Lightweight Drift Detection Engine
-Uses TF-IDF instead of sentence transformers for Windows compatibility
+Uses hashed term-frequency vectors instead of sentence transformers for Windows compatibility
 """
+import time
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity as sklearn_cosine_similarity
 from typing import List, Dict, Optional
 from dataclasses import dataclass
-from datetime import datetime
 
 
-@dataclass
-class ConversationTurn:
-    turn_number: int
-    user_message: str
-    assistant_response: str
-    timestamp: datetime
+def _identity(tokens):
+    """Pass-through analyzer so transform() accepts pretokenized lists"""
+    return tokens
 
 
 @dataclass
@@ -30,7 +25,7 @@ class DriftMetrics:
 class DriftEngine:
     def __init__(self, similarity_threshold: float = 0.45, check_interval: int = 3):
         """
-        Initialize the drift detection engine with TF-IDF
+        Initialize the drift detection engine with a hashing vectorizer
         
         Args:
             similarity_threshold: Below this cosine similarity, we consider the conversation drifting
@@ -39,27 +34,76 @@ class DriftEngine:
         self.threshold = similarity_threshold
         self.check_interval = check_interval
         
-        # Use TF-IDF vectorizer (lightweight alternative to transformers)
-        print("Loading TF-IDF vectorizer...")
-        self.vectorizer = TfidfVectorizer(
-            max_features=500,
-            ngram_range=(1, 2),
-            stop_words='english'
-        )
+        # Vectorizer and analyzer are built lazily on first use so importing
+        # this module (and cold-starting an API worker) doesn't pay for sklearn
+        self.vectorizer = None
+        self._analyzer = None
         
         # Conversation state
         self.north_star: Optional[str] = None
-        self.north_star_embedding: Optional[np.ndarray] = None
-        self.conversation_history: List[ConversationTurn] = []
+        self._ns_vec = None  # L2-normalized 1xN sparse row, cached at set_north_star
+        self._ns_dense = None  # same vector densified for O(1) index lookups
+        self._ns_tokens: frozenset = frozenset()  # north-star tokens for the fallback path
+        # Turn storage in struct-of-arrays layout: parallel lists plus the
+        # "user assistant" join built once per turn, so summaries never
+        # re-concatenate message pairs
+        self._user_msgs: List[str] = []
+        self._asst_msgs: List[str] = []
+        self._joined: List[str] = []
+        self._tokens: List[List[str]] = []  # analyzer output per turn, built once
+        self._timestamps: List[int] = []  # time.time_ns() per turn
         self.drift_history: List[DriftMetrics] = []
         self.last_good_turn = 0
-        self.all_texts = []  # Keep track of all texts for vectorizer
+        self._summary_cache: tuple = (-1, "")  # (history length, summary)
         
+    def _ensure_vectorizer(self):
+        """Build the vectorizer and analyzer on first use"""
+        if self.vectorizer is not None:
+            return
+        # Use a hashing vectorizer (lightweight alternative to transformers):
+        # fixed dimensionality, no vocabulary state, no fitting required
+        from sklearn.feature_extraction.text import HashingVectorizer
+        print("Loading hashing vectorizer...")
+        # The analyzer runs tokenization, stopword filtering, and bigram
+        # generation once per turn in _append_turn; transform() then takes
+        # pretokenized lists and skips the regex pass entirely
+        self._analyzer = HashingVectorizer(
+            ngram_range=(1, 2),
+            stop_words='english'
+        ).build_analyzer()
+        self.vectorizer = HashingVectorizer(
+            n_features=16384,
+            analyzer=_identity,
+            alternate_sign=False,
+            # Raw counts: normalization is folded into the similarity
+            # computation so each vector is traversed exactly once
+            norm=None,
+            # float32 is plenty for a 2-decimal threshold and halves the
+            # bandwidth of the sparse dot products
+            dtype=np.float32
+        )
+
     def set_north_star(self, initial_prompt: str):
         """Set the original goal/intent from Turn 1"""
+        self._ensure_vectorizer()
         self.north_star = initial_prompt
-        self.all_texts = [initial_prompt]
         self.last_good_turn = 1
+        # Normalize the north-star row once so cosine similarity against it
+        # reduces to a dot product, and densify it so per-check lookups are
+        # plain array indexing
+        self._ns_vec = self.vectorizer.transform([self._analyzer(initial_prompt)])
+        ns_norm = np.sqrt(self._ns_vec.data @ self._ns_vec.data)
+        if ns_norm > 0:
+            self._ns_vec.data /= ns_norm
+        self._ns_dense = np.zeros(self._ns_vec.shape[1], dtype=np.float32)
+        self._ns_dense[self._ns_vec.indices] = self._ns_vec.data
+        self._ns_tokens = frozenset(initial_prompt.lower().split())
+        # Sorted hash array for the fallback's vectorized Jaccard kernel
+        self._ns_hashes = np.unique(np.fromiter(
+            (hash(token) & 0xFFFFFFFF for token in self._ns_tokens),
+            dtype=np.uint32,
+            count=len(self._ns_tokens)
+        ))
         print(f"✅ North Star set: {initial_prompt[:100]}...")
         
     def add_turn(self, user_message: str, assistant_response: str) -> Optional[DriftMetrics]:
@@ -69,36 +113,108 @@ class DriftEngine:
         Returns:
             DriftMetrics if drift check was performed, None otherwise
         """
-        turn_number = len(self.conversation_history) + 1
-        turn = ConversationTurn(
-            turn_number=turn_number,
-            user_message=user_message,
-            assistant_response=assistant_response,
-            timestamp=datetime.now()
-        )
-        self.conversation_history.append(turn)
-        
-        # Add to all texts
-        self.all_texts.append(f"{user_message} {assistant_response}")
-        
+        turn_number = self._append_turn(user_message, assistant_response)
+
         # Check for drift at intervals
         if turn_number % self.check_interval == 0:
             return self.check_drift()
-        
+
         return None
-    
+
+    def _append_turn(self, user_message: str, assistant_response: str) -> int:
+        """Append one turn to the parallel lists and return its turn number"""
+        self._ensure_vectorizer()
+        self._user_msgs.append(user_message)
+        self._asst_msgs.append(assistant_response)
+        self._joined.append(f"{user_message} {assistant_response}")
+        # Tokenize once here; drift checks concatenate the cached lists
+        # instead of re-analyzing overlapping summary windows
+        self._tokens.append(self._analyzer(self._joined[-1]))
+        # time_ns avoids constructing a datetime object per turn; formatting
+        # happens only when a timestamp is actually serialized
+        self._timestamps.append(time.time_ns())
+        return len(self._joined)
+
+    def add_turns(self, turns: List[tuple]) -> List[DriftMetrics]:
+        """
+        Bulk-add turns (replay/backfill) and run all due drift checks in one batch
+
+        Args:
+            turns: list of (user_message, assistant_response) pairs
+
+        Returns:
+            DriftMetrics for every check interval crossed, in order
+        """
+        if not self.north_star:
+            raise ValueError("North Star not set. Call set_north_star() first.")
+
+        checkpoints = []
+        for user_message, assistant_response in turns:
+            turn_number = self._append_turn(user_message, assistant_response)
+            if turn_number % self.check_interval == 0:
+                checkpoints.append((turn_number, self._recent_tokens()))
+
+        if not checkpoints:
+            return []
+
+        similarities = self._score_batch([tokens for _, tokens in checkpoints])
+
+        results = []
+        for (turn_number, _), similarity in zip(checkpoints, similarities):
+            similarity = float(similarity)
+            is_drifting = similarity < self.threshold
+            if not is_drifting:
+                self.last_good_turn = turn_number
+            metrics = DriftMetrics(
+                turn_number=turn_number,
+                similarity_score=similarity,
+                is_drifting=is_drifting,
+                last_good_turn=self.last_good_turn
+            )
+            self.drift_history.append(metrics)
+            results.append(metrics)
+
+        return results
+
+    def check_drift_batch(self, states: List[str]) -> np.ndarray:
+        """
+        Score many state summaries against the North Star in a single matmul
+
+        The north-star row is prenormalized; the summaries' row norms are
+        computed in bulk and divided out of the dot products.
+        """
+        if not self.north_star:
+            raise ValueError("North Star not set. Call set_north_star() first.")
+
+        return self._score_batch([self._analyzer(state) for state in states])
+
+    def _score_batch(self, token_lists: List[List[str]]) -> np.ndarray:
+        """Cosine-score pretokenized documents against the north-star row"""
+        matrix = self.vectorizer.transform(token_lists)
+        dots = (matrix @ self._ns_vec.T).toarray().ravel()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
     def generate_state_summary(self) -> str:
         """
         Generate a summary of the last N turns
         """
-        # Take last 3 turns for context
-        recent_turns = self.conversation_history[-3:]
-        
-        summary_parts = []
-        for turn in recent_turns:
-            summary_parts.append(f"{turn.user_message} {turn.assistant_response}")
-        
-        return " ".join(summary_parts)
+        # Memoized by history length: /add-turn and /check-drift both call
+        # this for the same state, so repeated calls reuse the joined string
+        if self._summary_cache[0] == len(self._joined):
+            return self._summary_cache[1]
+
+        # Take last 3 turns for context; the per-turn joins are prebuilt
+        summary = " ".join(self._joined[-3:])
+        self._summary_cache = (len(self._joined), summary)
+        return summary
+
+    def _recent_tokens(self) -> List[str]:
+        """Concatenated cached token lists for the last 3 turns"""
+        tokens: List[str] = []
+        for turn_tokens in self._tokens[-3:]:
+            tokens.extend(turn_tokens)
+        return tokens
     
     def check_drift(self) -> DriftMetrics:
         """
@@ -109,35 +225,33 @@ class DriftEngine:
         """
         if not self.north_star:
             raise ValueError("North Star not set. Call set_north_star() first.")
-        
-        # Generate current state summary
-        current_state = self.generate_state_summary()
-        
-        # Create vectors using TF-IDF
-        texts = [self.north_star, current_state]
+
+        # Hash the cached turn tokens into the fixed feature space (no
+        # re-tokenization), then compute the dot product and the norm in one
+        # pass over the row's nonzeros — no separate normalization step and
+        # no intermediate sparse products
         try:
-            vectors = self.vectorizer.fit_transform(texts)
-            similarity_matrix = sklearn_cosine_similarity(vectors[0:1], vectors[1:2])
-            similarity = float(similarity_matrix[0][0])
+            current_vec = self.vectorizer.transform([self._recent_tokens()])
+            dot = float(current_vec.data @ self._ns_dense[current_vec.indices])
+            norm_sq = float(current_vec.data @ current_vec.data)
+            similarity = float(dot / np.sqrt(norm_sq)) if norm_sq > 0 else 0.0
         except Exception as e:
             print(f"Warning: Vectorization failed, using fallback: {e}")
-            # Simple fallback: word overlap ratio
-            north_words = set(self.north_star.lower().split())
-            current_words = set(current_state.lower().split())
-            if len(north_words | current_words) > 0:
-                similarity = len(north_words & current_words) / len(north_words | current_words)
-            else:
-                similarity = 0.0
+            # Simple fallback: Jaccard overlap on hashed tokens. Both sides
+            # are sorted uint32 arrays, so the intersection is a C-level
+            # sort-merge instead of Python set operations
+            similarity = self._fallback_similarity(self.generate_state_summary())
         
         # Determine if drifting
         is_drifting = similarity < self.threshold
-        
-        # Update last good turn
+
+        # Update last good turn (snapshot the length once)
+        turn_number = len(self._joined)
         if not is_drifting:
-            self.last_good_turn = len(self.conversation_history)
-        
+            self.last_good_turn = turn_number
+
         metrics = DriftMetrics(
-            turn_number=len(self.conversation_history),
+            turn_number=turn_number,
             similarity_score=float(similarity),
             is_drifting=is_drifting,
             last_good_turn=self.last_good_turn
@@ -149,21 +263,55 @@ class DriftEngine:
         
         return metrics
     
+    def _fallback_similarity(self, current_state: str) -> float:
+        """Jaccard overlap between hashed token arrays (vectorization fallback)"""
+        current_words = set(current_state.lower().split())
+        if not current_words and not self._ns_hashes.size:
+            return 0.0
+        current_hashes = np.unique(np.fromiter(
+            (hash(token) & 0xFFFFFFFF for token in current_words),
+            dtype=np.uint32,
+            count=len(current_words)
+        ))
+        intersection = np.intersect1d(
+            self._ns_hashes, current_hashes, assume_unique=True
+        ).size
+        union = self._ns_hashes.size + current_hashes.size - intersection
+        return intersection / union if union else 0.0
+
+    @property
+    def total_turns(self) -> int:
+        return len(self._joined)
+
+    def get_recent_turns(self, k: int = 5) -> List[Dict]:
+        """Serialize only the last k turns instead of the full history"""
+        start = max(len(self._joined) - k, 0)
+        return [
+            {
+                "turn": start + offset + 1,
+                "user": user,
+                "assistant": assistant
+            }
+            for offset, (user, assistant)
+            in enumerate(zip(self._user_msgs[start:], self._asst_msgs[start:]))
+        ]
+
     def get_conversation_summary(self) -> Dict:
         """Get a summary of the entire conversation state"""
         return {
-            "total_turns": len(self.conversation_history),
+            "total_turns": len(self._joined),
             "north_star": self.north_star,
             "last_good_turn": self.last_good_turn,
             "current_drift_status": self.drift_history[-1].is_drifting if self.drift_history else False,
             "drift_checks": len(self.drift_history),
             "conversation_history": [
                 {
-                    "turn": t.turn_number,
-                    "user": t.user_message,
-                    "assistant": t.assistant_response
+                    "turn": turn_number,
+                    "user": user,
+                    "assistant": assistant
                 }
-                for t in self.conversation_history
+                for turn_number, (user, assistant)
+                in enumerate(zip(self._user_msgs, self._asst_msgs), start=1)
             ]
         }
 
@@ -2,17 +2,27 @@
 Context Rot Monitor - FastAPI Server
 Exposes drift detection and supervisor analysis via REST API
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
+import asyncio
+import msgspec
 import os
+from collections import defaultdict
 from datetime import datetime
 
 from drift_engine import DriftEngine, DriftMetrics
 from supervisor import LLMSupervisor, SupervisorAnalysis
 
-app = FastAPI(title="Context Rot Monitor API", version="1.0.0")
+# orjson serializes responses in C, which matters for /get-state payloads
+# carrying long conversation histories
+app = FastAPI(
+    title="Context Rot Monitor API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
 
 # Enable CORS for Chrome extension
 app.add_middleware(
@@ -23,19 +33,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global state (in production, use Redis or similar)
-engine = DriftEngine(similarity_threshold=0.7, check_interval=3)
-supervisor = LLMSupervisor()
+# Single source of truth for drift detection tuning; /reset previously
+# rebuilt the engine with a different threshold than startup used
+DRIFT_THRESHOLD = 0.7
+CHECK_INTERVAL = 3
+
+# Per-conversation state (in production, use Redis or similar): engines are
+# sharded by conversation_id and each shard is guarded by its own
+# asyncio.Lock, so concurrent requests for different conversations never
+# contend and requests for the same conversation never race on engine state.
+# Oldest conversations are evicted once the cap is reached.
+MAX_CONVERSATIONS = 256
+
+engines: Dict[str, DriftEngine] = {}
+engine_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+supervisor: Optional[LLMSupervisor] = None
+
+
+def _get_engine(conversation_id: str) -> DriftEngine:
+    """Fetch or create the engine shard for a conversation"""
+    engine = engines.pop(conversation_id, None)
+    if engine is None:
+        if len(engines) >= MAX_CONVERSATIONS:
+            stalest = next(iter(engines))
+            engines.pop(stalest, None)
+            engine_locks.pop(stalest, None)
+        engine = DriftEngine(
+            similarity_threshold=DRIFT_THRESHOLD,
+            check_interval=CHECK_INTERVAL
+        )
+    # Re-insert on every access so dict order is least-recently-used first
+    # and eviction always removes the stalest conversation
+    engines[conversation_id] = engine
+    return engine
+
+
+@app.on_event("startup")
+async def initialize_services():
+    global supervisor
+    supervisor = LLMSupervisor()
 
 
 # Request/Response Models
 class InitializeRequest(BaseModel):
     north_star: str
+    conversation_id: str = "default"
 
 
-class TurnRequest(BaseModel):
+# Turn payloads arrive on the hottest endpoints, so they are parsed with
+# msgspec (C-level decode + validation) from the raw body instead of going
+# through Pydantic
+class TurnRequest(msgspec.Struct):
     user_message: str
     assistant_response: str
+    conversation_id: str = "default"
+
+
+class TurnsRequest(msgspec.Struct):
+    turns: List[TurnRequest]
+    conversation_id: str = "default"
 
 
 class DriftResponse(BaseModel):
@@ -77,7 +133,8 @@ async def root():
 async def initialize_conversation(request: InitializeRequest):
     """Set the North Star (original goal) for the conversation"""
     try:
-        engine.set_north_star(request.north_star)
+        async with engine_locks[request.conversation_id]:
+            _get_engine(request.conversation_id).set_north_star(request.north_star)
         return {
             "status": "success",
             "message": "North Star set successfully",
@@ -88,29 +145,40 @@ async def initialize_conversation(request: InitializeRequest):
 
 
 @app.post("/add-turn", response_model=Optional[DriftResponse])
-async def add_conversation_turn(request: TurnRequest):
+async def add_conversation_turn(raw_request: Request):
     """
     Add a conversation turn and automatically check for drift if needed
-    
+
     Returns drift analysis if this turn triggers a check (every N turns)
     """
     try:
-        drift_metrics = engine.add_turn(
-            user_message=request.user_message,
-            assistant_response=request.assistant_response
-        )
-        
+        request = msgspec.json.decode(await raw_request.body(), type=TurnRequest)
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        async with engine_locks[request.conversation_id]:
+            engine = _get_engine(request.conversation_id)
+            drift_metrics = engine.add_turn(
+                user_message=request.user_message,
+                assistant_response=request.assistant_response
+            )
+            if drift_metrics:
+                current_state = engine.generate_state_summary()
+                north_star = engine.north_star
+
         if not drift_metrics:
             return None
-        
+
         # If drifting, run supervisor analysis
         supervisor_data = None
         intervention = None
-        
+
         if drift_metrics.is_drifting:
-            current_state = engine.generate_state_summary()
-            analysis = supervisor.analyze_drift(
-                north_star=engine.north_star,
+            # Blocking Groq call: run in a worker thread so the event
+            # loop keeps serving concurrent requests
+            analysis = await asyncio.to_thread(
+                supervisor.analyze_drift,
+                north_star=north_star,
                 current_conversation=current_state,
                 similarity_score=drift_metrics.similarity_score
             )
@@ -123,10 +191,10 @@ async def add_conversation_turn(request: TurnRequest):
             }
             
             intervention = supervisor.generate_intervention_prompt(
-                engine.north_star,
+                north_star,
                 analysis
             )
-        
+
         return DriftResponse(
             turn_number=drift_metrics.turn_number,
             similarity_score=drift_metrics.similarity_score,
@@ -135,24 +203,70 @@ async def add_conversation_turn(request: TurnRequest):
             supervisor_analysis=supervisor_data,
             intervention_prompt=intervention
         )
-        
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/add-turns", response_model=List[DriftResponse])
+async def add_conversation_turns(raw_request: Request):
+    """
+    Add many conversation turns at once (replay/backfill)
+
+    All due drift checks are scored in a single batched transform instead of
+    one round-trip per turn. Supervisor analysis is skipped on this path.
+    """
+    try:
+        request = msgspec.json.decode(await raw_request.body(), type=TurnsRequest)
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        async with engine_locks[request.conversation_id]:
+            results = _get_engine(request.conversation_id).add_turns([
+                (turn.user_message, turn.assistant_response)
+                for turn in request.turns
+            ])
+
+        return [
+            DriftResponse(
+                turn_number=metrics.turn_number,
+                similarity_score=metrics.similarity_score,
+                is_drifting=metrics.is_drifting,
+                last_good_turn=metrics.last_good_turn
+            )
+            for metrics in results
+        ]
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/check-drift", response_model=DriftResponse)
-async def manual_drift_check():
+async def manual_drift_check(conversation_id: str = "default"):
     """Manually trigger a drift check"""
+    # Read-only lookup: a GET for an unknown conversation must not
+    # allocate a shard (or evict a live one)
+    engine = engines.get(conversation_id)
+    if engine is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown conversation: {conversation_id}"
+        )
     try:
-        drift_metrics = engine.check_drift()
-        
+        async with engine_locks[conversation_id]:
+            drift_metrics = engine.check_drift()
+            current_state = engine.generate_state_summary()
+            north_star = engine.north_star
+
         supervisor_data = None
         intervention = None
-        
+
         if drift_metrics.is_drifting:
-            current_state = engine.generate_state_summary()
-            analysis = supervisor.analyze_drift(
-                north_star=engine.north_star,
+            # Blocking Groq call: run in a worker thread so the event
+            # loop keeps serving concurrent requests
+            analysis = await asyncio.to_thread(
+                supervisor.analyze_drift,
+                north_star=north_star,
                 current_conversation=current_state,
                 similarity_score=drift_metrics.similarity_score
             )
@@ -165,7 +279,7 @@ async def manual_drift_check():
             }
             
             intervention = supervisor.generate_intervention_prompt(
-                engine.north_star,
+                north_star,
                 analysis
             )
         
@@ -183,21 +297,26 @@ async def manual_drift_check():
 
 
 @app.get("/get-state", response_model=ConversationState)
-async def get_conversation_state():
+async def get_conversation_state(conversation_id: str = "default"):
     """Get current conversation state and drift history"""
+    # Read-only lookup: a GET for an unknown conversation must not
+    # allocate a shard (or evict a live one)
+    engine = engines.get(conversation_id)
+    if engine is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown conversation: {conversation_id}"
+        )
     try:
-        summary = engine.get_conversation_summary()
-        
-        # Get last 5 turns for display
-        recent_turns = summary["conversation_history"][-5:] if summary["conversation_history"] else []
-        
+        # Only the last 5 turns are displayed, so don't materialize the
+        # full history via get_conversation_summary
         return ConversationState(
-            total_turns=summary["total_turns"],
-            north_star=summary["north_star"],
-            last_good_turn=summary["last_good_turn"],
-            current_drift_status=summary["current_drift_status"],
-            drift_checks=summary["drift_checks"],
-            recent_turns=recent_turns
+            total_turns=engine.total_turns,
+            north_star=engine.north_star,
+            last_good_turn=engine.last_good_turn,
+            current_drift_status=engine.drift_history[-1].is_drifting if engine.drift_history else False,
+            drift_checks=len(engine.drift_history),
+            recent_turns=engine.get_recent_turns(5)
         )
         
     except Exception as e:
@@ -205,10 +324,13 @@ async def get_conversation_state():
 
 
 @app.post("/reset")
-async def reset_conversation():
+async def reset_conversation(conversation_id: str = "default"):
     """Reset the conversation state"""
-    global engine
-    engine = DriftEngine(similarity_threshold=0.45, check_interval=3)
+    async with engine_locks[conversation_id]:
+        engines[conversation_id] = DriftEngine(
+            similarity_threshold=DRIFT_THRESHOLD,
+            check_interval=CHECK_INTERVAL
+        )
     return {"status": "success", "message": "Conversation reset"}
 
 
@@ -233,4 +355,15 @@ if __name__ == "__main__":
         print("\n⚠️  WARNING: GROQ_API_KEY not set!")
         print("Set it with: export GROQ_API_KEY='your-key-here'")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        # Conversation state lives in process memory, so keep one worker
+        # unless a shared store is configured; raise via WEB_CONCURRENCY
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        # "auto" upgrades to the uvloop event loop and httptools parser
+        # where installed (uvloop is skipped on Windows)
+        loop="auto",
+        http="auto"
+    )
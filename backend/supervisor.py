@@ -2,7 +2,9 @@
 Context Rot Monitor - LLM Supervisor
 Uses Groq's Llama-3 to provide qualitative analysis of drift
 """
+import hashlib
 import os
+import threading
 from groq import Groq
 from typing import Dict, Optional
 from dataclasses import dataclass
@@ -20,28 +22,46 @@ class SupervisorAnalysis:
 
 
 class LLMSupervisor:
+    CACHE_SIZE = 64
+
     def __init__(self, api_key: Optional[str] = None):
         """Initialize Groq client"""
         self.client = Groq(api_key=api_key or os.getenv("GROQ_API_KEY"))
         self.model = "llama-3.1-8b-instant"  # Fast and accurate
-        
+        # Analysis cache keyed by (goal, conversation digest, coarse score);
+        # guarded by a lock because analyze_drift runs in worker threads
+        self._analysis_cache: Dict[tuple, SupervisorAnalysis] = {}
+        self._cache_lock = threading.Lock()
+
     def analyze_drift(
-        self, 
-        north_star: str, 
+        self,
+        north_star: str,
         current_conversation: str,
         similarity_score: float
     ) -> SupervisorAnalysis:
         """
         Use LLM-as-a-Judge to analyze why drift occurred
-        
+
         Args:
             north_star: Original user goal
             current_conversation: Recent conversation context
             similarity_score: Numerical drift score
-            
+
         Returns:
             SupervisorAnalysis with actionable insights
         """
+        # Memoize on (goal, conversation digest, coarse score) so consecutive
+        # drifting turns with the same distraction reuse one LLM verdict
+        # instead of paying a remote call per turn
+        state_hash = hashlib.blake2b(
+            current_conversation.encode(), digest_size=8
+        ).hexdigest()
+        cache_key = (north_star, state_hash, round(similarity_score, 1))
+        with self._cache_lock:
+            cached = self._analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         system_prompt = """You are a conversation quality supervisor. Your job is to detect when an AI agent has drifted from the user's original goal and provide clear guidance to get back on track.
 
 Be concise and actionable. Focus on what matters."""
@@ -80,23 +100,31 @@ Format your response as JSON:
             
             import json
             result = json.loads(response.choices[0].message.content)
-            
-            return SupervisorAnalysis(
+
+            analysis = SupervisorAnalysis(
                 is_pursuing_goal=result.get("pursuing_goal", False),
                 distraction=result.get("distraction"),
                 realignment_instruction=result.get("realignment", "Return to the original goal."),
                 confidence=result.get("confidence", "medium")
             )
-            
+
         except Exception as e:
             print(f"⚠️ Supervisor analysis failed: {e}")
-            # Fallback analysis
+            # Fallback analysis — deliberately NOT cached, so a transient
+            # API failure is retried on the next check instead of pinning
+            # this state to an error verdict
             return SupervisorAnalysis(
                 is_pursuing_goal=similarity_score >= 0.45,
                 distraction="Unable to analyze (API error)",
                 realignment_instruction=f"Refocus on: {north_star}",
                 confidence="low"
             )
+
+        with self._cache_lock:
+            if len(self._analysis_cache) >= self.CACHE_SIZE:
+                self._analysis_cache.pop(next(iter(self._analysis_cache)))
+            self._analysis_cache[cache_key] = analysis
+        return analysis
     
     def generate_intervention_prompt(
         self, 
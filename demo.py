@@ -12,6 +12,11 @@ init(autoreset=True)
 API_URL = "http://localhost:8000"
 groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 
+# One session for all backend calls so HTTP keep-alive reuses the TCP
+# connection instead of paying a fresh handshake per turn
+session = requests.Session()
+session.headers.update({"Connection": "keep-alive"})
+
 conversation_history = []
 north_star = None
 drift_detected = False
@@ -68,7 +73,7 @@ Focus on what they're asking RIGHT NOW."""
 
 def check_drift(user_msg, assistant_msg):
     """Check for drift after adding turn"""
-    response = requests.post(
+    response = session.post(
         f"{API_URL}/add-turn",
         json={
             "user_message": user_msg,
@@ -97,7 +102,7 @@ def run_demo():
     
     # Health check
     try:
-        requests.get(f"{API_URL}/health")
+        session.get(f"{API_URL}/health")
         print(f"{Fore.GREEN}✅ Backend ready{Style.RESET_ALL}")
     except:
         print(f"{Fore.RED}❌ Backend not running{Style.RESET_ALL}")
@@ -108,7 +113,7 @@ def run_demo():
         return
     print(f"{Fore.GREEN}✅ AI ready{Style.RESET_ALL}\n")
     
-    requests.post(f"{API_URL}/reset")
+    session.post(f"{API_URL}/reset")
     
     turn = 1
     
@@ -128,7 +133,7 @@ def run_demo():
         # Set north star
         if turn == 1:
             north_star = user_input
-            requests.post(f"{API_URL}/initialize", json={"north_star": north_star})
+            session.post(f"{API_URL}/initialize", json={"north_star": north_star})
             print(f"\n{Fore.YELLOW}📍 North Star: {north_star}{Style.RESET_ALL}")
         
         # Check if should intervene